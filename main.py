@@ -1,12 +1,60 @@
 import yfinance as yf
-import pandas as pd
-from datetime import datetime
+import numpy as np
+from datetime import date, timedelta
+from bisect import bisect_left
+import orjson
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from cachetools import TTLCache
 from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import asynccontextmanager, suppress
+from types import MappingProxyType
+import asyncio
+import logging
+import os
+import random
+import threading
 import time
 
-app = FastAPI(title="Crypto & AI Covered Call Scanner")
+logger = logging.getLogger(__name__)
+
+def encode(content) -> bytes:
+    # orjson serializes the nested strategy floats far faster than stdlib json;
+    # values are already plain Python floats/ints, so no numpy option is needed
+    return orjson.dumps(content)
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return encode(content)
+
+async def refresh_loop():
+    # Keep every asset warm so the first client never pays a cold scan
+    loop = asyncio.get_running_loop()
+    run = cached_scan  # First pass shares in-flight scans with early requests
+    assets = [asset for asset, tickers in ASSET_GROUPS.items() if tickers]
+    while True:
+        results = await asyncio.gather(
+            *(loop.run_in_executor(SCAN_POOL, run, asset) for asset in assets),
+            return_exceptions=True,
+        )
+        for asset, result in zip(assets, results):
+            if isinstance(result, Exception):
+                logger.error("Background refresh of %s failed", asset, exc_info=result)
+        run = refresh_scan
+        await asyncio.sleep(scan_cache.ttl / 2)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(refresh_loop())
+    yield
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+app = FastAPI(title="Crypto & AI Covered Call Scanner", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,6 +64,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Scan payloads repeat the same keys for every strategy, so they compress well
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 asset_groups = {
     'BTC': ['IBIT', 'FBTC'],  # Only top 2 to avoid rate limits
     'ETH': ['ETHA', 'FETH', 'ETHV', 'ETHE', 'YETH', 'EHY'],
@@ -28,43 +79,128 @@ asset_groups = {
     'AI': ['SOUN', 'APLD', 'NBIS', 'EVLV', 'AI', 'HIMX', 'REKR', 'INOD', 'RR', 'NRDY', 'STIM', 'TLSI', 'VRNT', 'SYM', 'PLTR'],
 }
 
-def get_covered_call_strategies(ticker: str):
+# Frozen, upper-cased view used for lookups; scan_asset upper-cases the request
+ASSET_GROUPS = MappingProxyType({k.upper(): tuple(v) for k, v in asset_groups.items()})
+
+# Shared across all scans so concurrent requests can't multiply the load on Yahoo
+TICKER_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get("SCANNER_MAX_WORKERS", 8)))
+
+# Runs whole scans for the async endpoint; kept separate from TICKER_POOL so
+# scans waiting on their tickers can never starve them of workers
+SCAN_POOL = ThreadPoolExecutor(max_workers=16)
+
+week52_cache = TTLCache(maxsize=64, ttl=60 * 60)
+week52_lock = threading.Lock()
+
+# Per-ticker results; tickers that failed after retries (often a transient 429)
+# are retried much sooner, without refetching the healthy ones in their group
+ticker_cache = TTLCache(maxsize=256, ttl=5 * 60)
+ticker_error_cache = TTLCache(maxsize=256, ttl=30)
+ticker_lock = threading.Lock()
+
+scan_cache = TTLCache(maxsize=64, ttl=5 * 60)
+# Encoded scans that include a transient ticker failure expire with it
+scan_error_cache = TTLCache(maxsize=64, ttl=30)
+scan_inflight = {}
+scan_lock = threading.Lock()
+
+class NoOptionsError(ValueError):
+    # Yahoo returned no usable option chain. Retrying right away rarely helps, but
+    # an empty optionChain can be transient, so it is only negatively cached
+    pass
+
+def week52_range(hist_1y):
+    high_low = hist_1y[['High', 'Low']].to_numpy()
+    return float(np.nanmax(high_low[:, 0])), float(np.nanmin(high_low[:, 1]))
+
+@lru_cache(maxsize=1)
+def expiration_window(today: date):
+    # Bounds only change once a day, so format them once per day
+    return (today + timedelta(days=20)).isoformat(), (today + timedelta(days=40)).isoformat()
+
+def closest(idx, keys, k):
+    # Order the k smallest keys without sorting the whole chain
+    if len(idx) > k:
+        part = np.argpartition(keys, k - 1)[:k]
+        idx, keys = idx[part], keys[part]
+    return idx[np.argsort(keys, kind='stable')]
+
+def build_strategies(calls, current_price, top_itm=2, top_otm=5):
+    # Pure post-processing of a fetched chain, kept apart from the network calls.
+    # priced indexes the chain's arrays directly, so filtered rows never become a DataFrame
+    last_price = calls['lastPrice'].to_numpy()
+    premium = np.where(np.isnan(last_price), calls['bid'].to_numpy(), last_price)
+    priced = np.flatnonzero(premium > 0)  # NaN compares False, so missing premiums drop out too
+    if not priced.size:
+        return [], 0
+    
+    strike = calls['strike'].to_numpy()
+    below = priced[strike[priced] < current_price]
+    above = priced[strike[priced] > current_price]
+    selected = np.concatenate([
+        closest(below, -strike[below], top_itm),  # ITM, highest strike first
+        closest(above, strike[above], top_otm),  # OTM, lowest strike first
+    ])
+    
+    strike, premium = strike[selected], premium[selected]
+    iv = np.nan_to_num(calls['impliedVolatility'].to_numpy()[selected])
+    oi = np.nan_to_num(calls['openInterest'].to_numpy()[selected])
+    
+    pct = 100.0 / current_price
+    strategies_list = [
+        {
+            "strike": float(strike[i]),
+            "premium": float(premium[i]),
+            "impliedVolatility": float(iv[i]),
+            "openInterest": int(oi[i]),
+            "total_return_pct": float((premium[i] + strike[i] - current_price) * pct),
+            "premium_yield_pct": float(premium[i] * pct),
+            "downside_breakeven": float(current_price - premium[i]),
+        }
+        for i in range(len(selected))
+    ]
+    
+    return strategies_list, oi.sum()
+
+def get_covered_call_strategies(ticker: str, *, top_itm: int = 2, top_otm: int = 5):
     for attempt in range(3):
         try:
+            # yfinance routes every Ticker through one shared, pooled session,
+            # so connections to Yahoo are already reused across tickers
             etf = yf.Ticker(ticker)
             
-            hist_1d = etf.history(period='1d')
-            if hist_1d.empty:
+            # The 52-week range barely moves intraday, so only pull a full year of
+            # bars when it isn't cached; that same history also gives the price
+            with week52_lock:
+                cached_range = week52_cache.get(ticker)
+            hist = etf.history(period='1d' if cached_range else '1y')
+            if hist.empty:
                 raise ValueError(f"No price data for {ticker}")
-            current_price = hist_1d['Close'].iloc[-1]
+            current_price = hist['Close'].iloc[-1]
             
-            hist_1y = etf.history(period='1y')
-            week52_high = hist_1y['High'].max() if not hist_1y.empty else None
-            week52_low = hist_1y['Low'].min() if not hist_1y.empty else None
+            if cached_range:
+                week52_high, week52_low = cached_range
+            else:
+                week52_high, week52_low = week52_range(hist)
+                with week52_lock:
+                    week52_cache[ticker] = (week52_high, week52_low)
             
             expirations = etf.options
             if not expirations:
-                raise ValueError(f"No options for {ticker}")
+                raise NoOptionsError(f"No options for {ticker}")
             
-            today = datetime.now()
-            target_exp = None
-            for exp in expirations:
-                exp_date = datetime.strptime(exp, '%Y-%m-%d')
-                days = (exp_date - today).days
-                if 20 <= days <= 40:
-                    target_exp = exp
-                    break
+            # ISO dates sort lexicographically, so search the sorted list without parsing
+            lo, hi = expiration_window(date.today())
+            i = bisect_left(expirations, lo)
+            target_exp = expirations[i] if i < len(expirations) and expirations[i] <= hi else None
             
             if not target_exp:
-                raise ValueError(f"No monthly expiration for {ticker}")
+                raise NoOptionsError(f"No monthly expiration for {ticker}")
             
             opt_chain = etf.option_chain(target_exp)
-            calls = opt_chain.calls
-            
-            calls['premium'] = calls['lastPrice'].fillna(calls['bid'])
-            calls = calls[calls['premium'] > 0].dropna(subset=['premium'])
+            strategies_list, total_oi = build_strategies(opt_chain.calls, current_price, top_itm, top_otm)
             
-            if calls.empty:
+            if not strategies_list:
                 return {
                     "ticker": ticker,
                     "current_price": float(current_price),
@@ -76,23 +212,6 @@ def get_covered_call_strategies(ticker: str):
                     "message": "No calls with positive bid/last price."
                 }
             
-            itm_calls = calls[calls['strike'] < current_price].sort_values('strike', ascending=False).head(2)
-            otm_calls = calls[calls['strike'] > current_price].sort_values('strike', ascending=True).head(5)
-            
-            strategies = pd.concat([itm_calls, otm_calls])
-            strategies['cap_gain'] = strategies['strike'] - current_price
-            strategies['total_return_pct'] = ((strategies['premium'] + strategies['cap_gain']) / current_price) * 100
-            strategies['premium_yield_pct'] = (strategies['premium'] / current_price) * 100
-            strategies['downside_breakeven'] = current_price - strategies['premium']
-            
-            strategies = strategies.fillna(0)  # Fix NaN for JSON
-            
-            strategies = strategies[['strike', 'premium', 'impliedVolatility', 'openInterest', 'total_return_pct', 'premium_yield_pct', 'downside_breakeven']]
-            
-            strategies_list = strategies.to_dict(orient='records')
-            
-            total_oi = strategies['openInterest'].sum()
-            
             return {
                 "ticker": ticker,
                 "current_price": float(current_price),
@@ -103,32 +222,113 @@ def get_covered_call_strategies(ticker: str):
                 "total_open_interest": int(total_oi)
             }
         
-        except Exception as e:
+        except NoOptionsError:
+            raise
+        except Exception:
             if attempt == 2:
-                return {"error": f"Failed after retries: {str(e)}", "total_open_interest": 0}
-            time.sleep(5 * (attempt + 1))
+                raise
+            # Exponential backoff with jitter so parallel workers don't retry in lockstep
+            time.sleep(2 ** (attempt + 1) + random.uniform(0, 1))
 
-@lru_cache(maxsize=16)
-def cached_scan(asset: str):
-    tickers = asset_groups.get(asset.upper(), [])
-    if not tickers:
-        return {"error": f"No ETFs/stocks for '{asset}'."}
+def scan_ticker(ticker: str, refresh: bool = False):
+    # Returns (result, transient); failures and missing option chains are transient
+    # and only live in ticker_error_cache
+    if not refresh:
+        with ticker_lock:
+            for cache, transient in ((ticker_cache, False), (ticker_error_cache, True)):
+                if ticker in cache:
+                    return cache[ticker], transient
     
-    results = {}
-    for tick in tickers:
-        time.sleep(5)  # Increased to 5 seconds to avoid rate limit
-        results[tick] = get_covered_call_strategies(tick)
+    try:
+        result, transient = get_covered_call_strategies(ticker), False
+    except NoOptionsError as e:
+        result, transient = {"error": str(e), "total_open_interest": 0}, True
+    except Exception as e:
+        result, transient = {"error": f"Failed after retries: {str(e)}", "total_open_interest": 0}, True
+    
+    with ticker_lock:
+        # A failed refresh keeps serving the last good result until it expires
+        if transient and ticker in ticker_cache:
+            return ticker_cache[ticker], False
+        ticker_cache.pop(ticker, None)
+        ticker_error_cache.pop(ticker, None)
+        (ticker_error_cache if transient else ticker_cache)[ticker] = result
+    return result, transient
+
+def scan(asset: str, refresh: bool = False):
+    # Returns (results, transient), transient if any ticker's result was
+    tickers = ASSET_GROUPS[asset]
+    
+    # Each ticker is a handful of blocking Yahoo requests, so fetch them concurrently
+    futures = {TICKER_POOL.submit(scan_ticker, tick, refresh): tick for tick in tickers}
+    scanned = {futures[f]: f.result() for f in as_completed(futures)}
+    results = {tick: result for tick, (result, _) in scanned.items()}
+    transient = any(t for _, t in scanned.values())
     
     sorted_results = dict(sorted(results.items(), key=lambda x: x[1].get('total_open_interest', 0), reverse=True))
     
-    return sorted_results
+    return sorted_results, transient
+
+def store_scan(asset: str, result, transient):
+    # Cache the encoded body so cache hits skip serialization entirely
+    body = encode(result)
+    with scan_lock:
+        # Never replace a good scan with one that has transient failures
+        if transient and asset in scan_cache:
+            return scan_cache[asset]
+        scan_cache.pop(asset, None)
+        scan_error_cache.pop(asset, None)
+        (scan_error_cache if transient else scan_cache)[asset] = body
+    return body
+
+def run_scan(asset: str, refresh: bool = False):
+    # Unknown assets are not cached, so arbitrary paths can't evict real scans
+    if not ASSET_GROUPS.get(asset):
+        return encode({"error": f"No ETFs/stocks for '{asset}'."})
+    
+    # Concurrent scans of the same asset, whether client misses or background
+    # refreshes, share one in-flight scan instead of each hammering Yahoo
+    with scan_lock:
+        if not refresh:
+            for cache in (scan_cache, scan_error_cache):
+                if asset in cache:
+                    return cache[asset]
+        future = scan_inflight.get(asset)
+        owner = future is None
+        if owner:
+            future = scan_inflight[asset] = Future()
+    if not owner:
+        return future.result()
+    
+    # Whatever happens, waiters must be released and the in-flight entry cleared
+    try:
+        body = store_scan(asset, *scan(asset, refresh))
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(body)
+        return body
+    finally:
+        with scan_lock:
+            del scan_inflight[asset]
+
+def cached_scan(asset: str):
+    return run_scan(asset)
+
+def refresh_scan(asset: str):
+    # Rescan and overwrite the cached entry; readers keep the old one meanwhile
+    return run_scan(asset, refresh=True)
 
 @app.get("/scan/{asset}")
-def scan_asset(asset: str):
-    return cached_scan(asset.upper())
+async def scan_asset(asset: str):
+    # yfinance is blocking, so keep the scan off the event loop
+    loop = asyncio.get_running_loop()
+    body = await loop.run_in_executor(SCAN_POOL, cached_scan, asset.upper())
+    return Response(content=body, media_type="application/json")
 
 @app.get("/")
-def home():
+async def home():
     return {
         "title": "Crypto & AI Covered Call Scanner API",
         "message": "Use /scan/BTC, /scan/AI, /scan/XRP, etc. or /docs for interactive testing."
@@ -0,0 +1,148 @@
+import threading
+import types
+from collections import Counter
+from concurrent.futures import Future
+from datetime import date, timedelta
+
+import numpy as np
+import orjson
+import pandas as pd
+import pytest
+from cachetools import TTLCache
+
+import main
+
+
+class FakeYahoo:
+    # Stands in for yf.Ticker; every ticker has the same healthy chain unless listed in fail
+    def __init__(self):
+        self.fail = set()
+        self.history_calls = Counter()
+        self.gate = threading.Event()
+        self.gate.set()
+        self.entered = threading.Event()
+        today = date.today()
+        self.expirations = tuple((today + timedelta(days=d)).isoformat() for d in (7, 30, 60))
+
+    def Ticker(self, ticker):
+        yahoo = self
+
+        class Ticker:
+            def history(self, period='1d'):
+                yahoo.history_calls[ticker] += 1
+                yahoo.entered.set()
+                assert yahoo.gate.wait(5)
+                if ticker in yahoo.fail:
+                    raise RuntimeError("429 Too Many Requests")
+                n = 1 if period == '1d' else 250
+                return pd.DataFrame({'Close': np.full(n, 100.0), 'High': np.full(n, 120.0), 'Low': np.full(n, 50.0)})
+
+            @property
+            def options(self):
+                return yahoo.expirations
+
+            def option_chain(self, exp):
+                strike = np.arange(90.0, 111.0, 2.5)
+                calls = pd.DataFrame({
+                    'strike': strike,
+                    'lastPrice': 111.0 - strike,
+                    'bid': 110.0 - strike,
+                    'impliedVolatility': 0.5,
+                    'openInterest': 10.0,
+                })
+                return types.SimpleNamespace(calls=calls)
+
+        return Ticker()
+
+
+def in_thread(fn, *args):
+    # Daemon thread, so a waiter stuck on a leaked in-flight scan fails the test instead of hanging it
+    outcome = Future()
+
+    def run():
+        try:
+            outcome.set_result(fn(*args))
+        except BaseException as e:
+            outcome.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return outcome
+
+
+@pytest.fixture
+def clock():
+    return [0.0]
+
+
+@pytest.fixture
+def yahoo(monkeypatch, clock):
+    fake = FakeYahoo()
+    monkeypatch.setattr(main.yf, "Ticker", fake.Ticker)
+    monkeypatch.setattr(main, "time", types.SimpleNamespace(sleep=lambda seconds: None))
+    for name in ("ticker_cache", "ticker_error_cache", "scan_cache", "scan_error_cache", "week52_cache"):
+        cache = getattr(main, name)
+        monkeypatch.setattr(main, name, TTLCache(maxsize=cache.maxsize, ttl=cache.ttl, timer=lambda: clock[0]))
+    monkeypatch.setattr(main, "scan_inflight", {})
+    return fake
+
+
+def test_concurrent_misses_share_one_scan(yahoo):
+    yahoo.gate.clear()
+    owner = in_thread(main.cached_scan, 'BTC')
+    assert yahoo.entered.wait(5)
+    waiters = [in_thread(main.cached_scan, 'BTC') for _ in range(4)]
+    threading.Event().wait(0.1)  # let the waiters attach to the in-flight scan
+    yahoo.gate.set()
+    bodies = {f.result(timeout=5) for f in [owner, *waiters]}
+
+    assert len(bodies) == 1
+    assert yahoo.history_calls == Counter({'IBIT': 1, 'FBTC': 1})
+    assert main.scan_inflight == {}
+
+
+def test_failed_refresh_keeps_good_body(yahoo):
+    # Tickers tied on open interest may come back in either order, so compare decoded
+    good = orjson.loads(main.cached_scan('BTC'))
+    assert 'error' not in good['IBIT'] and 'error' not in good['FBTC']
+
+    yahoo.fail = {'IBIT', 'FBTC'}
+    assert orjson.loads(main.refresh_scan('BTC')) == good
+    assert orjson.loads(main.scan_cache['BTC']) == good
+    assert orjson.loads(main.cached_scan('BTC')) == good
+
+
+def test_transient_ticker_error_expires_on_its_own(yahoo, clock):
+    yahoo.fail = {'FBTC'}
+    result = orjson.loads(main.cached_scan('BTC'))
+    assert result['FBTC']['error'].startswith("Failed after retries")
+    assert 'BTC' in main.scan_error_cache and 'BTC' not in main.scan_cache
+
+    yahoo.fail.clear()
+    clock[0] += main.scan_error_cache.ttl + 1
+    result = orjson.loads(main.cached_scan('BTC'))
+
+    assert result['FBTC']['strategies']
+    assert yahoo.history_calls['IBIT'] == 1  # the healthy ticker came from ticker_cache
+    assert 'BTC' in main.scan_cache
+
+
+def test_failed_owner_releases_waiters(yahoo, monkeypatch):
+    encode = main.encode
+
+    def broken_encode(content):
+        raise RuntimeError("encode failed")
+
+    monkeypatch.setattr(main, "encode", broken_encode)
+    yahoo.gate.clear()
+    owner = in_thread(main.cached_scan, 'BTC')
+    assert yahoo.entered.wait(5)
+    waiter = in_thread(main.cached_scan, 'BTC')
+    threading.Event().wait(0.1)
+    yahoo.gate.set()
+    for f in (owner, waiter):
+        with pytest.raises(RuntimeError, match="encode failed"):
+            f.result(timeout=5)
+
+    assert main.scan_inflight == {}
+    monkeypatch.setattr(main, "encode", encode)
+    assert orjson.loads(main.cached_scan('BTC'))['IBIT']['strategies']